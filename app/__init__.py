@@ -15,6 +15,13 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Seconds a request may take before unfinished audit sections are returned as pending
+    app.config['AUDIT_DEADLINE'] = float(os.getenv('AUDIT_DEADLINE', '20'))
+    # Finish pending sections in the background and store them, with this much time in total
+    app.config['AUDIT_BACKGROUND'] = os.getenv('AUDIT_BACKGROUND', '1') == '1'
+    app.config['AUDIT_BACKGROUND_SECONDS'] = float(os.getenv('AUDIT_BACKGROUND_SECONDS', '120'))
+    # Seconds a rewrite may take; long articles are slow to rewrite, so this is kept apart from AUDIT_DEADLINE
+    app.config['REWRITE_DEADLINE'] = float(os.getenv('REWRITE_DEADLINE', '180'))
 
     db.init_app(app)
     migrate.init_app(app, db)
@@ -22,6 +29,10 @@ def create_app():
     from .routes import main
     app.register_blueprint(main)
 
+    from .commands import feeds_cli, embeddings_cli
+    app.cli.add_command(feeds_cli)
+    app.cli.add_command(embeddings_cli)
+
     @app.context_processor
     def inject_current_user():
         from .models import User
@@ -0,0 +1,84 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy.orm import undefer
+
+from .models import db, FeedItem, FeedSource, NewsArticle
+from .services.feed_utils import run_poller
+from .services.vector_store import get_vector_store, index_articles
+
+feeds_cli = AppGroup('feeds', help="Manage and poll RSS/Atom/sitemap feeds.")
+embeddings_cli = AppGroup('embeddings', help="Maintain the similar-article vector index.")
+
+
+@feeds_cli.command('add')
+@click.argument('url')
+@click.option('--name', default=None, help="Display name, defaults to the URL.")
+@click.option('--interval', default=900, show_default=True, help="Initial poll interval in seconds.")
+@click.option('--min-interval', default=300, show_default=True)
+@click.option('--max-interval', default=21600, show_default=True)
+def add_feed(url, name, interval, min_interval, max_interval):
+    if FeedSource.query.filter_by(url=url).first():
+        raise click.ClickException("Feed already exists.")
+    db.session.add(FeedSource(
+        name=name or url,
+        url=url,
+        poll_interval=interval,
+        min_interval=min_interval,
+        max_interval=max_interval,
+    ))
+    db.session.commit()
+    click.echo(f"Added feed {url}")
+
+
+@feeds_cli.command('list')
+def list_feeds():
+    for source in FeedSource.query.order_by(FeedSource.id).all():
+        state = "active" if source.active else "paused"
+        click.echo(f"{source.id}\t{state}\t{source.poll_interval}s\tnext {source.next_poll_at}\t{source.name}")
+
+
+@feeds_cli.command('remove')
+@click.argument('feed_id', type=int)
+def remove_feed(feed_id):
+    source = db.session.get(FeedSource, feed_id)
+    if not source:
+        raise click.ClickException("No such feed.")
+    FeedItem.query.filter_by(source_id=source.id).delete()
+    db.session.delete(source)
+    db.session.commit()
+    click.echo(f"Removed feed {source.url}")
+
+
+@feeds_cli.command('poll')
+@click.option('--once', is_flag=True, help="Poll due feeds once and exit instead of running as a daemon.")
+@click.option('--workers', default=4, show_default=True, help="Articles fetched and analyzed concurrently.")
+def poll_feeds(once, workers):
+    stored = run_poller(once=once, max_workers=workers)
+    if once:
+        click.echo(f"Stored {stored} new article(s).")
+
+
+@embeddings_cli.command('backfill')
+@click.option('--batch-size', default=64, show_default=True)
+def backfill_embeddings(batch_size):
+    """Embed saved articles that are not in the vector store yet."""
+    known = get_vector_store().known_ids()
+    query = NewsArticle.query.options(undefer(NewsArticle.full_text)).order_by(NewsArticle.id)
+    last_id = 0
+    added = 0
+    while True:
+        batch = query.filter(NewsArticle.id > last_id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        added += index_articles([article for article in batch if article.id not in known])
+        db.session.expunge_all()
+    click.echo(f"Embedded {added} article(s).")
+
+
+@embeddings_cli.command('build-index')
+@click.option('--lists', 'n_lists', default=None, type=int, help="Number of partitions, defaults to sqrt(rows).")
+def build_embeddings_index(n_lists):
+    """Train the IVF partition index; worth it from ~100k articles."""
+    n_lists = get_vector_store().build_index(n_lists=n_lists)
+    click.echo(f"Built IVF index with {n_lists} partition(s).")
@@ -1,5 +1,31 @@
 from . import db
 from datetime import datetime
+from sqlalchemy.orm import deferred
+from sqlalchemy.types import TypeDecorator
+import zlib
+
+# zlib level for stored article bodies; 6 is the speed/size sweet spot
+COMPRESSION_LEVEL = 6
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored zlib-compressed in a binary column.
+    Reads and writes plain str, so callers never see the compression.
+    """
+    impl = db.LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(value.encode("utf-8"), COMPRESSION_LEVEL)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.decompress(value).decode("utf-8")
+
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -13,10 +39,58 @@ class User(db.Model):
 class NewsArticle(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(300))
-    url = db.Column(db.String(500))
-    full_text = db.Column(db.Text)
+    url = db.Column(db.String(500), index=True)
+    # Only the audit itself needs the body; list views leave it unloaded
+    full_text = deferred(db.Column(CompressedText))
     summary = db.Column(db.Text)
     bias = db.Column(db.String(50))
     tone = db.Column(db.String(50))
     emotion_score = db.Column(db.Text)
+    # Who analyzed it: "gpt", "triage" (judged low-signal offline, never sent to GPT)
+    # or "fallback" (offline estimate standing in for a GPT analysis that failed)
+    analysis_source = db.Column(db.String(20), nullable=False, default="gpt", server_default="gpt")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class FeedSource(db.Model):
+    __tablename__ = 'feed_sources'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    url = db.Column(db.String(500), unique=True, nullable=False)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    # Adaptive polling interval in seconds, kept within [min_interval, max_interval]
+    poll_interval = db.Column(db.Integer, nullable=False, default=900)
+    min_interval = db.Column(db.Integer, nullable=False, default=300)
+    max_interval = db.Column(db.Integer, nullable=False, default=21600)
+    next_poll_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_polled_at = db.Column(db.DateTime)
+    # Conditional GET validators from the last 200 response
+    etag = db.Column(db.String(255))
+    last_modified = db.Column(db.String(100))
+    # Newest entry date seen so far; older entries are skipped
+    watermark = db.Column(db.DateTime)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class FeedItem(db.Model):
+    # Feed items whose article could not be fetched, so retries can be capped
+    __tablename__ = 'feed_items'
+    __table_args__ = (db.UniqueConstraint('source_id', 'url'),)
+    id = db.Column(db.Integer, primary_key=True)
+    source_id = db.Column(db.Integer, db.ForeignKey('feed_sources.id', ondelete='CASCADE'), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(255))
+    # Not fetched again once set: a 4xx answer or too many failed attempts
+    given_up = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class AuditSection(db.Model):
+    __tablename__ = 'audit_sections'
+    __table_args__ = (db.UniqueConstraint('article_id', 'name'),)
+    id = db.Column(db.Integer, primary_key=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('news_article.id', ondelete='CASCADE'), nullable=False)
+    # analysis, headlines, fact_check, bias_framing, tone_effect or similar
+    name = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.Enum('done', 'pending', 'timed_out'), nullable=False, default='pending')
+    content = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,45 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, Response, stream_with_context, jsonify, current_app, get_template_attribute
 from werkzeug.security import generate_password_hash, check_password_hash
 from .models import db, User, NewsArticle
 from .forms import NewsInputForm
-from .services.ai_utils import analyze_article, rewrite_article, generate_diff_html, suggest_headlines, fact_check_claims, bias_framing_analysis, tone_effect_analysis
+from .services.fetch_utils import fetch_text_from_url
+from .services.ai_utils import analyze_article, rewrite_article, stream_rewrite_article, IncrementalWordDiff, generate_diff_html
+from .services.lexicon_utils import quick_analyze
+from .services.deadline_utils import Deadline
+from .services.audit_utils import run_audit, load_sections, prepare_for_display, ABANDON_GRACE
 from urllib.parse import urlparse
 from .rbac import role_required
-import json, requests
-import re
-from bs4 import BeautifulSoup
+import json
 
 main = Blueprint('main', __name__)
 
-def fetch_text_from_url(url):
-    try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.content, "html.parser")
-        paragraphs = soup.find_all("p")
-        return " ".join([p.get_text() for p in paragraphs])[:5000]
-    except Exception as e:
-        print("Fetch error:", e)
-        return ""
-
-def clean_bullet_points(raw_text):
-    """
-    Converts raw bullet points into HTML-safe list items,
-    with **Heading**: converted to <strong>Heading</strong>:
-    """
-    lines = []
-    for line in raw_text.splitlines():
-        line = line.strip().lstrip("-•* ").strip()
-        if not line:
-            continue
-
-        # Convert Markdown-style bold heading (**Heading**:) to <strong>Heading</strong>:
-        line = re.sub(r"\*\*(.+?)\*\*:", r"<strong>\1</strong>:", line)
-        line = re.sub(r"(.+?)\*\*:", r"<strong>\1</strong>:", line)  # Handle: Heading**:
-        line = re.sub(r"\*\*(.+?):", r"<strong>\1</strong>:", line)  # Handle: **Heading:
-        
-        lines.append(line)
-    return lines
-
 @main.route('/')
 def home():
     return redirect(url_for('main.login'))
@@ -70,23 +43,27 @@ def dashboard():
         return render_template('dashboard_employee.html')
 
     total_articles = NewsArticle.query.count()
+    # Offline estimates standing in for GPT are left out of the aggregates below.
+    # Triage verdicts stay in: they are what calm articles are stored with
+    analyzed = NewsArticle.analysis_source != "fallback"
+    fallback_articles = NewsArticle.query.filter(NewsArticle.analysis_source == "fallback").count()
 
     # Most common tone
     common_tone = db.session.query(
         NewsArticle.tone,
         db.func.count(NewsArticle.tone).label("count")
-    ).group_by(NewsArticle.tone).order_by(db.desc("count")).first()
+    ).filter(analyzed).group_by(NewsArticle.tone).order_by(db.desc("count")).first()
     most_common_tone = common_tone[0] if common_tone else "N/A"
 
     # Most common perspective
     common_perspective = db.session.query(
         NewsArticle.bias,
         db.func.count(NewsArticle.bias).label("count")
-    ).group_by(NewsArticle.bias).order_by(db.desc("count")).first()
+    ).filter(analyzed, NewsArticle.bias != "Unknown").group_by(NewsArticle.bias).order_by(db.desc("count")).first()
     most_common_perspective = common_perspective[0] if common_perspective else "N/A"
 
     # Avg anger
-    emotion_scores = NewsArticle.query.with_entities(NewsArticle.emotion_score).all()
+    emotion_scores = NewsArticle.query.filter(analyzed).with_entities(NewsArticle.emotion_score).all()
     total_anger = 0.0
     count = 0
     for row in emotion_scores:
@@ -119,12 +96,14 @@ def dashboard():
             "fear": emotions.get("fear", 0),
             "surprise": emotions.get("surprise", 0),
             "url": art.url or "#",
-            "domain": domain
+            "domain": domain,
+            "source": art.analysis_source
         })
 
     return render_template(
         'dashboard.html',
         total_articles=total_articles,
+        fallback_articles=fallback_articles,
         most_common_tone=most_common_tone,
         most_common_perspective=most_common_perspective,
         avg_anger=avg_anger,
@@ -204,67 +183,55 @@ def mediaaudit():
     form = NewsInputForm()
     result = None
 
-    def fetch_text_from_url(url):
-        try:
-            response = requests.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, "html.parser")
-            paragraphs = soup.find_all("p")
-            return " ".join([p.get_text() for p in paragraphs])[:5000]
-        except Exception as e:
-            print("Fetch error:", e)
-            return ""
-
     if form.validate_on_submit():
-        text = form.raw_text.data or fetch_text_from_url(form.url.data)
-        analysis = analyze_article(text)
+        deadline = Deadline(current_app.config['AUDIT_DEADLINE'])
+        text = form.raw_text.data or fetch_text_from_url(form.url.data, deadline=deadline)
 
-        summary = analysis.get("summary", "Not available")
-        perspective_label = analysis.get("perspective_label", "Unknown")
-        tone = analysis.get("tone", "Unknown")
-        tone_color = analysis.get("tone_color", "secondary")
-        emotion_score = analysis.get("emotion_score", {})
-
-        headline_suggestion, headline_variants = suggest_headlines(text)
-        claims_factcheck = fact_check_claims(text)
-
-        # Split bias and tone into bullet list items
-        claims_factcheck_raw = fact_check_claims(text)
-        bias_framing_raw = bias_framing_analysis(text)
-        tone_effect_raw = tone_effect_analysis(text)
-
-        claims_factcheck = clean_bullet_points(claims_factcheck_raw)
-        bias_framing = clean_bullet_points(bias_framing_raw)
-        tone_effect = clean_bullet_points(tone_effect_raw)
-
-        # Store minimal to DB
+        # Saved with the offline estimate first; the GPT analysis replaces it once it lands
+        estimate = quick_analyze(text)
         article = NewsArticle(
             title='',
             url=form.url.data,
             full_text=text,
-            summary=summary,
-            bias=perspective_label,
-            tone=tone,
-            emotion_score=json.dumps(emotion_score),
+            summary=estimate["summary"],
+            bias=estimate["perspective_label"],
+            tone=estimate["tone"],
+            emotion_score=json.dumps(estimate["emotion_score"]),
+            analysis_source="fallback",
         )
         db.session.add(article)
         db.session.commit()
 
+        sections = run_audit(
+            article.id, text, deadline,
+            background=current_app.config['AUDIT_BACKGROUND'],
+            background_seconds=current_app.config['AUDIT_BACKGROUND_SECONDS'],
+        )
+
         result = {
-            "summary": summary,
-            "perspective_label": perspective_label,
-            "tone": tone,
-            "tone_color": tone_color,
-            "emotion_score": emotion_score,
-            "headline_suggestion": headline_suggestion,
-            "headline_variants": headline_variants,
-            "claims_factcheck": claims_factcheck,
-            "bias_framing": bias_framing,
-            "tone_effect": tone_effect,
+            "article_id": article.id,
+            "sections": prepare_for_display(article, sections),
         }
 
     return render_template('mediaaudit.html', form=form, result=result)
 
 
+@main.route('/mediaaudit/<int:article_id>/sections')
+def audit_sections(article_id):
+    """
+    Current state of each audit section, rendered, for pages waiting on pending ones.
+    """
+    article = NewsArticle.query.get_or_404(article_id)
+    # Background sections are out of time by then, so one still pending was lost
+    stale_after = current_app.config['AUDIT_BACKGROUND_SECONDS'] + ABANDON_GRACE
+    sections = prepare_for_display(article, load_sections(article_id, stale_after=stale_after))
+    render_section = get_template_attribute('_audit_sections.html', 'audit_section')
+    return jsonify({
+        name: {"status": section["status"], "html": str(render_section(name, section))}
+        for name, section in sections.items()
+    })
+
+
 @main.route('/compare', methods=['GET', 'POST'])
 def compare_articles():
     results = []
@@ -275,11 +242,12 @@ def compare_articles():
         text1 = request.form.get('text1', '').strip()
         text2 = request.form.get('text2', '').strip()
 
-        article_1_text = text1 or fetch_text_from_url(url1)
-        article_2_text = text2 or fetch_text_from_url(url2)
+        deadline = Deadline(current_app.config['AUDIT_DEADLINE'])
+        article_1_text = text1 or fetch_text_from_url(url1, deadline=deadline)
+        article_2_text = text2 or fetch_text_from_url(url2, deadline=deadline)
 
         if article_1_text:
-            a1 = analyze_article(article_1_text)
+            a1 = analyze_article(article_1_text, deadline=deadline)
             results.append({
                 "summary": a1.get("summary"),
                 "perspective_label": a1.get("perspective_label"),
@@ -289,7 +257,7 @@ def compare_articles():
             })
 
         if article_2_text:
-            a2 = analyze_article(article_2_text)
+            a2 = analyze_article(article_2_text, deadline=deadline)
             results.append({
                 "summary": a2.get("summary"),
                 "perspective_label": a2.get("perspective_label"),
@@ -307,11 +275,14 @@ def rewrite_assistant():
     result = None
 
     if form.validate_on_submit():
-        text = form.raw_text.data or fetch_text_from_url(form.url.data)
-
-        rewritten = rewrite_article(text)
-        original_analysis = analyze_article(text)
-        rewritten_analysis = analyze_article(rewritten)
+        deadline = Deadline(current_app.config['REWRITE_DEADLINE'])
+        text = form.raw_text.data or fetch_text_from_url(form.url.data, deadline=deadline)
+
+        rewritten = rewrite_article(text, deadline=deadline)
+        # The analyses get the usual budget, not what the rewrite left over
+        deadline = Deadline(current_app.config['AUDIT_DEADLINE'])
+        original_analysis = analyze_article(text, deadline=deadline)
+        rewritten_analysis = analyze_article(rewritten, deadline=deadline)
         diff_html = generate_diff_html(text, rewritten)
 
         result = {
@@ -322,4 +293,50 @@ def rewrite_assistant():
             "diff_html": diff_html
         }
 
-    return render_template('rewrite.html', form=form, result=result)
\ No newline at end of file
+    return render_template('rewrite.html', form=form, result=result)
+
+
+@main.route('/rewrite/stream', methods=['POST'])
+def rewrite_stream():
+    """
+    Streams the rewrite as newline-delimited JSON events. The first one carries
+    the original text (fetched, for a URL); the next ones the new tokens and the
+    diff HTML committed so far; the last one adds the analyses of both versions,
+    and "timed_out" if the rewrite was cut off. Invalid input gets a 400 with
+    the form errors.
+    """
+    form = NewsInputForm()
+    if not form.validate_on_submit():
+        return jsonify({"errors": form.errors}), 400
+    if not (form.raw_text.data or form.url.data):
+        return jsonify({"errors": {"raw_text": ["Paste an article or enter its URL."]}}), 400
+
+    deadline = Deadline(current_app.config['REWRITE_DEADLINE'])
+    text = form.raw_text.data or fetch_text_from_url(form.url.data, deadline=deadline)
+    if not text:
+        return jsonify({"errors": {"url": ["Could not get the article text from this URL."]}}), 400
+    analysis_seconds = current_app.config['AUDIT_DEADLINE']
+
+    def generate():
+        yield json.dumps({"original": text}) + "\n"
+
+        differ = IncrementalWordDiff(text)
+        pieces = []
+
+        for token in stream_rewrite_article(text, deadline=deadline):
+            pieces.append(token)
+            yield json.dumps({"token": token, "diff": differ.feed(token)}) + "\n"
+
+        timed_out = deadline.expired
+        rewritten = "".join(pieces).strip()
+        analysis_deadline = Deadline(analysis_seconds)
+        yield json.dumps({
+            "done": True,
+            "timed_out": timed_out,
+            "diff": differ.finish(),
+            "rewritten_text": rewritten,
+            "original_analysis": analyze_article(text, deadline=analysis_deadline),
+            "rewritten_analysis": analyze_article(rewritten, deadline=analysis_deadline),
+        }) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -2,11 +2,22 @@ import os
 import json
 from openai import OpenAI
 import difflib
-from markupsafe import Markup
+from markupsafe import Markup, escape
+from .lexicon_utils import quick_analyze
 
 # Initialize OpenAI client with API key
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+
+def client_for(deadline=None):
+    """
+    The shared client, or, under a deadline, one that times out when the
+    deadline does and doesn't retry past it.
+    """
+    if deadline is None:
+        return client
+    return client.with_options(timeout=deadline.timeout(), max_retries=0)
+
 TONE_COLOR_MAP = {
     "Neutral": "secondary",
     "Angry": "danger",
@@ -18,24 +29,151 @@ def get_tone_color(tone):
     return TONE_COLOR_MAP.get(tone, "secondary")
 
 
+def _diff_word_html(line: str) -> str:
+    """
+    Render one line of ndiff output over words, or "" for hint lines.
+    Words come from fetched pages and model output, so they are escaped.
+    """
+    if line.startswith("- "):
+        return f"<span style='background-color:#ffcccc;' title='Removed'>{escape(line[2:])}</span>"
+    elif line.startswith("+ "):
+        return f"<span style='background-color:#ccffcc;' title='Added'>{escape(line[2:])}</span>"
+    elif line.startswith("  "):
+        return str(escape(line[2:]))
+    return ""
+
+
+class IncrementalWordDiff:
+    """
+    Word-level diff against the original that can be fed the rewritten text
+    chunk by chunk, e.g. while a rewrite is still being streamed.
+
+    A rewritten word is only diffed once `window` stable words are available
+    from the current position, so HTML that has been handed out never changes
+    and the final result is the same however the text was chunked.
+
+    Anchors are looked for within `lookahead` words of the current position in
+    the original, so a sentence the rewrite moved up is marked as added rather
+    than everything before its old place being marked as removed. Only after a
+    whole window without an anchor (e.g. a dropped paragraph) does the search
+    extend to the rest of the original.
+    """
+
+    def __init__(self, original: str, window: int = 48, anchor: int = 3, lookahead: int = 96):
+        self.original = original.split()
+        self.window = window
+        self.anchor = anchor
+        self.lookahead = lookahead
+        self._rewritten = []
+        self._orig_pos = 0
+        self._rew_pos = 0
+        self._unanchored = 0
+        self._partial = ""
+        self._parts = []
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add a piece of rewritten text and return the HTML it committed.
+        """
+        text = self._partial + chunk
+        words = text.split()
+        # The last word may still grow with the next chunk
+        if words and not text[-1].isspace():
+            self._partial = words.pop()
+        else:
+            self._partial = ""
+        self._rewritten.extend(words)
+
+        start = len(self._parts)
+        while len(self._rewritten) - self._rew_pos >= self.window:
+            self._step()
+        return " ".join(self._parts[start:])
+
+    def finish(self) -> str:
+        """
+        Flush the trailing word and diff whatever is left.
+        """
+        start = len(self._parts)
+        if self._partial:
+            self._rewritten.append(self._partial)
+            self._partial = ""
+        while len(self._rewritten) - self._rew_pos >= self.window:
+            self._step()
+        self._commit(self.original[self._orig_pos:], self._rewritten[self._rew_pos:])
+        self._orig_pos = len(self.original)
+        self._rew_pos = len(self._rewritten)
+        return " ".join(self._parts[start:])
+
+    def html(self) -> str:
+        return Markup(" ".join(self._parts))
+
+    def _commit(self, old, new):
+        for line in difflib.ndiff(old, new):
+            rendered = _diff_word_html(line)
+            if rendered:
+                self._parts.append(rendered)
+
+    def _find_anchor(self, old, new):
+        # The run of `anchor` matching words that leaves the fewest words
+        # (skipped original + skipped rewrite) to mark before it
+        first_seen = {}
+        for a in range(len(old) - self.anchor + 1):
+            first_seen.setdefault(tuple(old[a:a + self.anchor]), a)
+
+        best = None
+        for b in range(len(new) - self.anchor + 1):
+            if best is not None and b >= best[0] + best[1]:
+                break
+            a = first_seen.get(tuple(new[b:b + self.anchor]))
+            if a is not None and (best is None or a + b < best[0] + best[1]):
+                best = (a, b)
+        if best is None:
+            return None
+
+        a, b = best
+        size = self.anchor
+        while a + size < len(old) and b + size < len(new) and old[a + size] == new[b + size]:
+            size += 1
+        return a, b, size
+
+    def _step(self):
+        remaining = self.original[self._orig_pos:]
+        window = self._rewritten[self._rew_pos:self._rew_pos + self.window]
+        if self._unanchored < self.window:
+            remaining = remaining[:self.lookahead]
+
+        # Resynchronise on a run of `anchor` matching words
+        found = self._find_anchor(remaining, window)
+        if found:
+            a, b, size = found
+            self._commit(remaining[:a], window[:b])
+            self._parts.extend(str(escape(word)) for word in window[b:b + size])
+            self._orig_pos += a + size
+            self._rew_pos += b + size
+            self._unanchored = 0
+            return
+
+        # No anchor in sight: settle just the first word of the window
+        if remaining and remaining[0] == window[0]:
+            self._parts.append(str(escape(window[0])))
+            self._orig_pos += 1
+        else:
+            self._commit([], window[:1])
+            self._unanchored += 1
+        self._rew_pos += 1
+
+
 def generate_diff_html(original: str, rewritten: str) -> str:
     """
     Generate word-level diff HTML between original and rewritten text.
     """
-    diff = difflib.ndiff(original.split(), rewritten.split())
-    result = []
-
-    for word in diff:
-        if word.startswith("- "):
-            result.append(f"<span style='background-color:#ffcccc;' title='Removed'>{word[2:]}</span>")
-        elif word.startswith("+ "):
-            result.append(f"<span style='background-color:#ccffcc;' title='Added'>{word[2:]}</span>")
-        elif word.startswith("  "):
-            result.append(word[2:])
-    return Markup(" ".join(result))
+    differ = IncrementalWordDiff(original)
+    differ.feed(rewritten)
+    differ.finish()
+    return differ.html()
 
 
-def analyze_article(text):
+def analyze_article(text, deadline=None):
     prompt = f'''
 You are a news media analyst. Analyze the following news article and return a JSON object with the following structure:
 
@@ -54,7 +192,7 @@ Article:
 '''
 
     def call_gpt(model_name):
-        return client.chat.completions.create(
+        return client_for(deadline).chat.completions.create(
             model=model_name,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.5,
@@ -97,16 +235,13 @@ Article:
     except Exception as e:
         print("🔥 GPT API error:", e)
 
-    return {
-        "summary": "Could not process article.",
-        "perspective_label": "Unknown",
-        "tone": "Unknown",
-        "tone_color": "secondary",
-        "emotion_score": {"anger": 0, "joy": 0, "fear": 0, "surprise": 0},
-    }
+    # Degraded mode: approximate locally instead of reporting zeros
+    fallback = quick_analyze(text)
+    fallback["tone_color"] = get_tone_color(fallback["tone"])
+    return fallback
 
-def rewrite_article(text):
-    prompt = f'''
+def _rewrite_prompt(text):
+    return f'''
 You are an editor helping improve clarity and engagement in news reporting. 
 Rewrite the article below to make it clearer and concise so that users are more engrossed in reading the whole article. 
 Analyze the current tone and improve it. Also improve perspective and emotional score.
@@ -117,8 +252,11 @@ Original Article:
 {text}
 '''
 
+def rewrite_article(text, deadline=None):
+    prompt = _rewrite_prompt(text)
+
     try:
-        response = client.chat.completions.create(
+        response = client_for(deadline).chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.5
@@ -130,7 +268,39 @@ Original Article:
         return "Rewrite failed due to API error."
 
 
-def suggest_headlines(text):
+def stream_rewrite_article(text, deadline=None):
+    """
+    Same rewrite as rewrite_article, but yields text deltas as GPT produces them.
+    """
+    prompt = _rewrite_prompt(text)
+    emitted = False
+
+    try:
+        stream = client_for(deadline).chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.5,
+            stream=True
+        )
+        for chunk in stream:
+            # Stream read timeouts are per chunk, so check the overall budget too
+            if deadline is not None and deadline.expired:
+                stream.close()
+                print("⌛ Rewrite stream cut off at deadline")
+                break
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                emitted = True
+                yield delta
+    except Exception as e:
+        print("🔥 Rewrite stream error:", e)
+        if not emitted:
+            yield "Rewrite failed due to API error."
+
+
+def suggest_headlines(text, deadline=None):
     prompt = f"""
 You're an editorial headline expert. Given the article content below, suggest:
 1. One improved, engaging headline that is clear and professional (not clickbait)
@@ -144,7 +314,7 @@ Headline: ...
 Variants: ...
 """
     try:
-        response = client.chat.completions.create(
+        response = client_for(deadline).chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.6
@@ -159,7 +329,7 @@ Variants: ...
         return "Unavailable", "Unavailable"
 
 
-def fact_check_claims(text):
+def fact_check_claims(text, deadline=None):
     prompt = f"""
 You are a fact-checking assistant. Extract key factual claims from this article and verify them against known public facts. 
 Return brief results in the form of bullet points with claim# and verification# for display.
@@ -170,7 +340,7 @@ Article:
 {text}
 """
     try:
-        response = client.chat.completions.create(
+        response = client_for(deadline).chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4
@@ -181,7 +351,7 @@ Article:
         return Markup("<p>Fact-checking failed or not available.</p>")
 
 
-def bias_framing_analysis(text):
+def bias_framing_analysis(text, deadline=None):
     prompt = f"""
 You are a media framing analyst.
 
@@ -196,7 +366,7 @@ Article:
 {text}
 """
     try:
-        response = client.chat.completions.create(
+        response = client_for(deadline).chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.5
@@ -207,7 +377,7 @@ Article:
         return "Framing analysis unavailable."
 
 
-def tone_effect_analysis(text):
+def tone_effect_analysis(text, deadline=None):
     prompt = f"""
 You're a tone and communication strategist.
 
@@ -222,7 +392,7 @@ Article:
 {text}
 """
     try:
-        response = client.chat.completions.create(
+        response = client_for(deadline).chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.5
@@ -0,0 +1,285 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from ..models import db, AuditSection, NewsArticle
+from .ai_utils import analyze_article, suggest_headlines, fact_check_claims, bias_framing_analysis, tone_effect_analysis, get_tone_color
+from .deadline_utils import Deadline, DeadlineExceeded
+from .vector_store import index_and_match, index_articles, get_vector_store
+
+# Shared by every audit, so sections left to finish in the background
+# can't pile up threads without bound
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("AUDIT_WORKERS", "16")))
+# Sections submitted but not finished, across audits. Past AUDIT_MAX_QUEUED, new
+# audits don't finish in the background, so the executor's queue stays bounded
+MAX_QUEUED = int(os.getenv("AUDIT_MAX_QUEUED", "64"))
+_queued = 0
+_queued_lock = threading.Lock()
+# Extra seconds abandoned sections may run past the deadline, so a call that is
+# cut off right at it is reported as timed out rather than as its fallback text
+ABANDON_GRACE = 2
+
+
+def clean_bullet_points(raw_text):
+    """
+    Converts raw bullet points into HTML-safe list items,
+    with **Heading**: converted to <strong>Heading</strong>:
+    """
+    lines = []
+    for line in raw_text.splitlines():
+        line = line.strip().lstrip("-•* ").strip()
+        if not line:
+            continue
+
+        # Convert Markdown-style bold heading (**Heading**:) to <strong>Heading</strong>:
+        line = re.sub(r"\*\*(.+?)\*\*:", r"<strong>\1</strong>:", line)
+        line = re.sub(r"(.+?)\*\*:", r"<strong>\1</strong>:", line)  # Handle: Heading**:
+        line = re.sub(r"\*\*(.+?):", r"<strong>\1</strong>:", line)  # Handle: **Heading:
+
+        lines.append(line)
+    return lines
+
+
+def _analysis(text, article_id, deadline):
+    return analyze_article(text, deadline=deadline)
+
+
+def _headlines(text, article_id, deadline):
+    headline, variants = suggest_headlines(text, deadline=deadline)
+    return {"headline": headline, "variants": variants}
+
+
+def _fact_check(text, article_id, deadline):
+    return clean_bullet_points(fact_check_claims(text, deadline=deadline))
+
+
+def _bias_framing(text, article_id, deadline):
+    return clean_bullet_points(bias_framing_analysis(text, deadline=deadline))
+
+
+def _tone_effect(text, article_id, deadline):
+    return clean_bullet_points(tone_effect_analysis(text, deadline=deadline))
+
+
+def _similar(text, article_id, deadline):
+    return index_and_match(article_id, text, deadline=deadline)
+
+
+# Every section of a media audit; each returns JSON-able data
+AUDIT_SECTIONS = {
+    "analysis": _analysis,
+    "headlines": _headlines,
+    "fact_check": _fact_check,
+    "bias_framing": _bias_framing,
+    "tone_effect": _tone_effect,
+    "similar": _similar,
+}
+
+
+def save_section(article_id, name, status, data=None):
+    section = AuditSection.query.filter_by(article_id=article_id, name=name).first()
+    if section is None:
+        section = AuditSection(article_id=article_id, name=name)
+        db.session.add(section)
+    section.status = status
+    section.content = json.dumps(data) if data is not None else None
+
+    # The GPT analysis replaces the offline estimate the article was saved with
+    if name == "analysis" and status == "done":
+        article = db.session.get(NewsArticle, article_id)
+        article.summary = data.get("summary", "Not available")
+        article.bias = data.get("perspective_label", "Unknown")
+        article.tone = data.get("tone", "Unknown")
+        article.emotion_score = json.dumps(data.get("emotion_score", {}))
+        article.analysis_source = data.get("source", "gpt")
+
+    db.session.commit()
+
+
+def _section_done(future):
+    global _queued
+    with _queued_lock:
+        _queued -= 1
+
+
+def _finish_later(app, article_id, name):
+    def callback(future):
+        if future.cancelled():
+            return
+        with app.app_context():
+            try:
+                save_section(article_id, name, "done", future.result())
+            except Exception as e:
+                print(f"🛑 Background section error ({name}):", e)
+                db.session.rollback()
+                save_section(article_id, name, "timed_out")
+    return callback
+
+
+def _index_if_missed(app, article_id):
+    # The similar section is what adds a new article to the vector store. When it
+    # fails or runs out of time, the article is indexed on its own so later audits
+    # can still match it.
+    def index():
+        with app.app_context():
+            try:
+                if article_id not in get_vector_store().known_ids():
+                    index_articles([db.session.get(NewsArticle, article_id)])
+            except Exception as e:
+                print(f"🛑 Could not index article {article_id}, run `flask embeddings backfill`:", e)
+
+    def callback(future):
+        if not future.cancelled() and future.exception() is None:
+            return
+        print(f"⚠️ Similar section of article {article_id} didn't finish, indexing the article separately")
+        try:
+            _executor.submit(index)
+        except RuntimeError as e:  # the executor is shutting down
+            print(f"🛑 Could not index article {article_id}, run `flask embeddings backfill`:", e)
+    return callback
+
+
+def run_audit(article_id, text, deadline, background=True, background_seconds=120):
+    """
+    Run every audit section concurrently and return what finished by the deadline
+    as {name: {"status": ..., "data": ...}}.
+
+    Sections still running are "pending" and saved once they finish when
+    `background` is on (each gets `background_seconds` in total, queueing
+    included), otherwise they are "timed out" and abandoned. A section that
+    runs out of time is "timed out" rather than saved with its fallback text.
+    Every outcome is stored as an AuditSection. If the similar section misses,
+    the article is still added to the vector store afterwards.
+    """
+    global _queued
+    app = current_app._get_current_object()
+    with _queued_lock:
+        if _queued >= MAX_QUEUED:
+            print(f"⚠️ {_queued} audit sections queued, not finishing this audit in the background")
+            background = False
+        _queued += len(AUDIT_SECTIONS)
+    if background:
+        budget = Deadline(background_seconds)
+    else:
+        budget = Deadline(deadline.remaining() + ABANDON_GRACE)
+
+    def run(name, fn):
+        def task():
+            # The GPT helpers turn a timeout into fallback text, which must not count as done
+            if budget.expired:
+                raise DeadlineExceeded(f"{name} was still queued at its deadline")
+            with app.app_context():
+                data = fn(text, article_id, budget)
+            if budget.expired:
+                raise DeadlineExceeded(f"{name} ran out of time")
+            return data
+        return task
+
+    futures = {name: _executor.submit(run(name, fn)) for name, fn in AUDIT_SECTIONS.items()}
+    for future in futures.values():
+        future.add_done_callback(_section_done)
+    futures["similar"].add_done_callback(_index_if_missed(app, article_id))
+    finished, _ = wait(futures.values(), timeout=deadline.remaining())
+
+    sections = {}
+    for name, future in futures.items():
+        if future in finished and future.exception() is None:
+            sections[name] = {"status": "done", "data": future.result()}
+        elif future in finished:
+            print(f"🛑 Section error ({name}):", future.exception())
+            sections[name] = {"status": "timed_out", "data": None}
+        elif background:
+            sections[name] = {"status": "pending", "data": None}
+        else:
+            future.cancel()
+            sections[name] = {"status": "timed_out", "data": None}
+        save_section(article_id, name, sections[name]["status"], sections[name]["data"])
+
+    # Register only after "pending" is stored, so a late result can't be overwritten by it
+    if background:
+        for name, future in futures.items():
+            if sections[name]["status"] == "pending":
+                future.add_done_callback(_finish_later(app, article_id, name))
+
+    return sections
+
+
+def load_sections(article_id, stale_after=None):
+    """
+    Stored sections of an audit, in the shape run_audit returns.
+    Sections pending for more than `stale_after` seconds were lost (e.g. with a
+    restarted worker) and are marked as timed out.
+    """
+    stored = AuditSection.query.filter_by(article_id=article_id).all()
+
+    if stale_after is not None:
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+        stale = [s for s in stored if s.status == "pending" and s.updated_at and s.updated_at < cutoff]
+        for section in stale:
+            section.status = "timed_out"
+        if stale:
+            db.session.commit()
+
+    return {
+        section.name: {
+            "status": section.status,
+            "data": json.loads(section.content) if section.content else None,
+        }
+        for section in stored
+    }
+
+
+def resolve_similar(matches):
+    """
+    Turn [(article_id, score), ...] into dicts for the Similar Earlier Coverage panel.
+    """
+    if not matches:
+        return []
+    by_id = {
+        art.id: art for art in
+        NewsArticle.query.filter(NewsArticle.id.in_([article_id for article_id, _ in matches])).all()
+    }
+    return [
+        {
+            "id": article_id,
+            "title": by_id[article_id].title,
+            "summary": by_id[article_id].summary,
+            "url": by_id[article_id].url,
+            "tone": by_id[article_id].tone,
+            "created_at": by_id[article_id].created_at,
+            "score": round(score, 2),
+        }
+        for article_id, score in matches if article_id in by_id
+    ]
+
+
+def prepare_for_display(article, sections):
+    """
+    Fill in what the templates need: the saved offline estimate while the
+    GPT analysis is missing, and article details for similar matches.
+    """
+    analysis = sections.get("analysis")
+    if analysis and analysis["data"] is None:
+        try:
+            emotion_score = json.loads(article.emotion_score)
+        except Exception:
+            emotion_score = {"anger": 0, "joy": 0, "fear": 0, "surprise": 0}
+        analysis["data"] = {
+            "summary": article.summary,
+            "perspective_label": article.bias,
+            "tone": article.tone,
+            "tone_color": get_tone_color(article.tone),
+            "emotion_score": emotion_score,
+            "heuristic": True,
+        }
+
+    similar = sections.get("similar")
+    if similar and similar["data"] is not None:
+        similar["data"] = resolve_similar(similar["data"])
+
+    return sections
@@ -0,0 +1,32 @@
+import time
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """
+    Point in time a request has to be answered by. Passed down to fetches and
+    GPT calls, which use what is left of it as their timeout.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, cap=None):
+        """
+        Seconds left, at most `cap`. Raises DeadlineExceeded once nothing is left.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline of {self.seconds}s exceeded")
+        return remaining if cap is None else min(cap, remaining)
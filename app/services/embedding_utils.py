@@ -0,0 +1,67 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+
+from .ai_utils import client_for
+
+# "openai" in production; "local" gives deterministic, offline vectors for tests and dev
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+OPENAI_EMBEDDING_DIM = 1536
+LOCAL_EMBEDDING_DIM = 256
+# Characters of each article sent for embedding
+MAX_EMBED_CHARS = 8000
+# Texts per embeddings API request
+EMBED_BATCH = 64
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def embedding_model():
+    """
+    (name, dimension) of the active backend. Stored with the vectors so
+    vectors from different models are never mixed.
+    """
+    if EMBEDDING_BACKEND == "local":
+        return "local-hash", LOCAL_EMBEDDING_DIM
+    return OPENAI_EMBEDDING_MODEL, OPENAI_EMBEDDING_DIM
+
+
+def _local_embedding(text):
+    # Feature hashing over words and word pairs, a stand-in with no network
+    vector = np.zeros(LOCAL_EMBEDDING_DIM, dtype=np.float32)
+    tokens = _TOKEN_RE.findall(text.lower())
+    for feature in tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % LOCAL_EMBEDDING_DIM
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    return vector
+
+
+def embed_texts(texts, deadline=None):
+    """
+    Embed texts into an (n, dim) float32 matrix with L2-normalised rows,
+    so a dot product is the cosine similarity.
+    """
+    texts = [(text or "")[:MAX_EMBED_CHARS] for text in texts]
+    _, dim = embedding_model()
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32)
+
+    if EMBEDDING_BACKEND == "local":
+        matrix = np.stack([_local_embedding(text) for text in texts])
+    else:
+        rows = []
+        for i in range(0, len(texts), EMBED_BATCH):
+            response = client_for(deadline).embeddings.create(
+                model=OPENAI_EMBEDDING_MODEL,
+                input=[text or " " for text in texts[i:i + EMBED_BATCH]],
+            )
+            rows.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        matrix = np.asarray(rows, dtype=np.float32)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
@@ -0,0 +1,337 @@
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import requests
+
+from ..models import db, FeedItem, FeedSource, NewsArticle
+from .ai_utils import analyze_article
+from .fetch_utils import fetch_article
+from .lexicon_utils import quick_analyze, is_low_signal
+from .vector_store import index_articles
+
+# Most items taken from one feed per poll, so a backlog can't flood the API
+MAX_ITEMS_PER_POLL = 20
+# Factors applied to poll_interval after a poll with / without new items
+SPEEDUP = 0.5
+SLOWDOWN = 1.5
+# URLs per IN (...) lookup against NewsArticle
+DEDUP_CHUNK = 500
+# Longest the daemon sleeps before re-checking for due feeds
+IDLE_SLEEP = 60
+# Failed fetches of one item before it is given up; a 4xx answer gives up at once
+MAX_ITEM_ATTEMPTS = 3
+
+
+class FeedEntry:
+    def __init__(self, url, title="", published=None):
+        self.url = url
+        self.title = title
+        self.published = published
+
+
+def _tag(element):
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def _child_text(element, name):
+    for child in element:
+        if _tag(child) == name:
+            return (child.text or "").strip()
+    return ""
+
+
+def _parse_date(value):
+    """
+    Parse RFC 822 (RSS) or ISO 8601 (Atom, sitemaps) dates to naive UTC.
+    """
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_feed(content):
+    """
+    Parse an RSS 2.0, Atom or sitemap document into a list of FeedEntry.
+    """
+    root = ET.fromstring(content)
+    entries = []
+
+    for item in root.iter():
+        kind = _tag(item)
+        if kind == "item":
+            # RSS
+            url = _child_text(item, "link") or _child_text(item, "guid")
+            published = _child_text(item, "pubDate") or _child_text(item, "date")
+            entries.append(FeedEntry(url, _child_text(item, "title"), _parse_date(published)))
+        elif kind == "entry":
+            # Atom: prefer the alternate link
+            url = ""
+            for link in item:
+                if _tag(link) == "link" and link.get("rel", "alternate") == "alternate":
+                    url = link.get("href", "")
+                    break
+            published = _child_text(item, "published") or _child_text(item, "updated")
+            entries.append(FeedEntry(url, _child_text(item, "title"), _parse_date(published)))
+        elif kind == "url":
+            # Sitemap, optionally with a Google News extension
+            title = ""
+            published = _child_text(item, "lastmod")
+            for child in item:
+                if _tag(child) == "news":
+                    title = _child_text(child, "title")
+                    published = _child_text(child, "publication_date") or published
+            entries.append(FeedEntry(_child_text(item, "loc"), title, _parse_date(published)))
+
+    if _tag(root) == "sitemapindex":
+        print("⚠️ Sitemap index given, add the child sitemaps as separate feeds")
+
+    return [entry for entry in entries if entry.url]
+
+
+def fetch_feed(source, http=requests):
+    """
+    Conditional GET of a feed. Returns the body, or None if unchanged (304).
+    file:// URLs are read from disk so local fixture feeds can be polled.
+    """
+    parsed = urlparse(source.url)
+    if parsed.scheme == "file":
+        path = url2pathname(parsed.path)
+        last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+        if source.last_modified == last_modified:
+            return None
+        with open(path, "rb") as f:
+            content = f.read()
+        source.last_modified = last_modified
+        return content
+
+    headers = {}
+    if source.etag:
+        headers["If-None-Match"] = source.etag
+    if source.last_modified:
+        headers["If-Modified-Since"] = source.last_modified
+
+    response = http.get(source.url, headers=headers, timeout=10)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+
+    source.etag = response.headers.get("ETag")
+    source.last_modified = response.headers.get("Last-Modified")
+    return response.content
+
+
+def new_entries(source, entries):
+    """
+    Drop entries at or below the feed's watermark, URLs already audited and
+    items given up on.
+    """
+    if source.watermark:
+        entries = [e for e in entries if e.published is None or e.published > source.watermark]
+
+    # Feeds can list the same link twice
+    unique = {}
+    for entry in entries:
+        unique.setdefault(entry.url, entry)
+
+    if not unique:
+        return []
+
+    urls = list(unique)
+    known = set()
+    for i in range(0, len(urls), DEDUP_CHUNK):
+        chunk = urls[i:i + DEDUP_CHUNK]
+        known.update(
+            row[0] for row in
+            db.session.query(NewsArticle.url).filter(NewsArticle.url.in_(chunk)).all()
+        )
+        known.update(
+            row[0] for row in
+            db.session.query(FeedItem.url).filter(
+                FeedItem.source_id == source.id, FeedItem.given_up.is_(True), FeedItem.url.in_(chunk)
+            ).all()
+        )
+    fresh = [entry for url, entry in unique.items() if url not in known]
+
+    # Oldest first, so a capped poll leaves the newest for the next round
+    fresh.sort(key=lambda e: e.published or datetime.max)
+    return fresh
+
+
+def audit_entry(entry):
+    """
+    Fetch and analyze one feed item. Runs in a worker thread, so it must not touch the DB.
+    Low-signal articles keep the offline analysis and skip GPT.
+    Returns (entry, text, analysis, error), with only the error set if the fetch failed.
+    """
+    try:
+        text = fetch_article(entry.url, raise_errors=True)[0]
+    except Exception as e:
+        print(f"Fetch error ({entry.url}):", e)
+        return entry, None, None, e
+    if not text:
+        return entry, None, None, "No article text found"
+
+    analysis = quick_analyze(text)
+    if is_low_signal(analysis):
+        analysis["source"] = "triage"
+    else:
+        analysis = analyze_article(text)
+    return entry, text, analysis, None
+
+
+def _is_permanent(error):
+    # Client errors other than timeouts and rate limits won't go away on a retry
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+
+def record_failure(source, item, entry, error):
+    """
+    Count a failed fetch of a feed item. Returns True if it will be retried.
+    """
+    if item is None:
+        item = FeedItem(source_id=source.id, url=entry.url, attempts=0)
+        db.session.add(item)
+    item.attempts += 1
+    item.last_error = str(error)[:255]
+    item.given_up = item.attempts >= MAX_ITEM_ATTEMPTS or _is_permanent(error)
+    if item.given_up:
+        print(f"⚠️ Giving up on {entry.url} after {item.attempts} attempt(s): {error}")
+    return not item.given_up
+
+
+def reschedule(source, found_new, failed=False):
+    now = datetime.utcnow()
+    if failed:
+        source.error_count += 1
+        interval = source.poll_interval * (2 ** min(source.error_count, 5))
+    else:
+        source.error_count = 0
+        factor = SPEEDUP if found_new else SLOWDOWN
+        interval = source.poll_interval * factor
+        source.poll_interval = int(min(max(interval, source.min_interval), source.max_interval))
+        interval = source.poll_interval
+
+    source.last_polled_at = now
+    source.next_poll_at = now + timedelta(seconds=min(interval, source.max_interval))
+
+
+def poll_source(source, executor, http=requests):
+    """
+    Poll one feed and audit its new items. Returns the number of articles stored.
+    """
+    try:
+        content = fetch_feed(source, http=http)
+        entries = parse_feed(content) if content is not None else []
+    except Exception as e:
+        print(f"🛑 Feed error ({source.url}):", e)
+        reschedule(source, found_new=False, failed=True)
+        db.session.commit()
+        return 0
+
+    fresh = new_entries(source, entries)
+    batch = fresh[:MAX_ITEMS_PER_POLL]
+    stored = []
+    retrying = []
+
+    # Items that failed on an earlier poll
+    previous = {}
+    urls = [entry.url for entry in batch]
+    for i in range(0, len(urls), DEDUP_CHUNK):
+        previous.update(
+            (item.url, item) for item in
+            FeedItem.query.filter(FeedItem.source_id == source.id, FeedItem.url.in_(urls[i:i + DEDUP_CHUNK])).all()
+        )
+
+    for entry, text, analysis, error in executor.map(audit_entry, batch):
+        item = previous.get(entry.url)
+        if analysis is None:
+            if record_failure(source, item, entry, error):
+                retrying.append(entry)
+            continue
+        if item is not None:
+            db.session.delete(item)
+        article = NewsArticle(
+            title=entry.title[:300],
+            url=entry.url,
+            full_text=text,
+            summary=analysis.get("summary", "Not available"),
+            bias=analysis.get("perspective_label", "Unknown"),
+            tone=analysis.get("tone", "Unknown"),
+            emotion_score=json.dumps(analysis.get("emotion_score", {})),
+            analysis_source=analysis.get("source", "gpt"),
+        )
+        db.session.add(article)
+        stored.append(article)
+
+    # Only move the watermark past what was actually handled this round,
+    # and not past items that will be retried. Given-up items don't hold it back.
+    handled = batch if len(fresh) > len(batch) else entries
+    if len(fresh) > len(batch) or retrying:
+        # Leftovers and retries must not be hidden behind a 304 on the next poll
+        source.etag = None
+        source.last_modified = None
+    dated = [e.published for e in handled if e.published]
+    retry_dates = [e.published for e in retrying if e.published]
+    if retry_dates:
+        dated = [published for published in dated if published < min(retry_dates)]
+    if dated:
+        source.watermark = max([source.watermark or datetime.min] + dated)
+
+    # Retries alone don't count as new items, so they don't speed polling up
+    reschedule(source, found_new=any(entry.url not in previous for entry in fresh))
+    db.session.commit()
+
+    try:
+        index_articles(stored)
+    except Exception as e:
+        print(f"🛑 Embedding error ({source.url}):", e)
+    return len(stored)
+
+
+def run_poller(once=False, max_workers=4, http=requests):
+    """
+    Poll every due feed, then sleep until the next one is due. With once=True,
+    a single round is run and the number of stored articles returned.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            now = datetime.utcnow()
+            due = FeedSource.query.filter(
+                FeedSource.active.is_(True),
+                db.or_(FeedSource.next_poll_at.is_(None), FeedSource.next_poll_at <= now)
+            ).order_by(FeedSource.next_poll_at).all()
+
+            stored = 0
+            for source in due:
+                count = poll_source(source, executor, http=http)
+                stored += count
+                print(f"📰 {source.name}: {count} new article(s), next poll in {source.poll_interval}s")
+
+            if once:
+                return stored
+
+            upcoming = db.session.query(db.func.min(FeedSource.next_poll_at)).filter(
+                FeedSource.active.is_(True)
+            ).scalar()
+            # End the read transaction so the next round sees new feeds
+            db.session.rollback()
+            wait = (upcoming - datetime.utcnow()).total_seconds() if upcoming else IDLE_SLEEP
+            time.sleep(min(max(wait, 1), IDLE_SLEEP))
@@ -0,0 +1,36 @@
+import requests
+from bs4 import BeautifulSoup
+from urllib.parse import urlparse
+
+from .text_utils import extract_paragraphs, clean_paragraphs, format_stats, page_key
+
+# Seconds allowed for one page fetch
+FETCH_TIMEOUT = 10
+# Characters of article text passed on to the GPT prompts
+MAX_ARTICLE_CHARS = 5000
+
+
+def fetch_article(url, deadline=None, raise_errors=False):
+    """
+    Fetch a page and return (cleaned article text, per-stage cleaning stats).
+    Errors give ("", []) unless `raise_errors` is set.
+    """
+    try:
+        timeout = deadline.timeout(FETCH_TIMEOUT) if deadline else FETCH_TIMEOUT
+        response = requests.get(url, timeout=timeout)
+        # Error pages must not be analyzed (or stored by the feed poller) as articles
+        response.raise_for_status()
+        soup = BeautifulSoup(response.content, "html.parser")
+        site = urlparse(url).netloc.replace("www.", "")
+        text, stats = clean_paragraphs(extract_paragraphs(soup), site=site, page=page_key(url))
+        print(f"🧹 Cleaned {url}: {format_stats(stats)}")
+        return text[:MAX_ARTICLE_CHARS], stats
+    except Exception as e:
+        if raise_errors:
+            raise
+        print("Fetch error:", e)
+        return "", []
+
+
+def fetch_text_from_url(url, deadline=None):
+    return fetch_article(url, deadline=deadline)[0]
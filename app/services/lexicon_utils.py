@@ -0,0 +1,151 @@
+import re
+from collections import Counter
+
+# Offline, lexicon-based approximation of analyze_article.
+# Used to triage articles before paying for GPT and as a fallback when the API is down.
+# Results carry "heuristic": True so they can be told apart from GPT output, and
+# "source": "fallback"; callers that keep them on purpose set it to "triage".
+
+EMOTION_LEXICON = {
+    "anger": """
+        anger angry angered outrage outraged outrageous furious fury rage raged raging
+        slam slams slammed blast blasts blasted lash lashes lashed condemn condemns
+        condemned blame blames blamed attack attacks attacked betray betrayed betrayal
+        hostile hostility hate hatred hated resent resentment disgust disgusted
+        scandal scandalous corrupt corruption protest protests protesters clash clashes
+        clashed violent violence riot riots fight fights fighting accuse accused
+        """,
+    "joy": """
+        joy joyful happy happiness celebrate celebrates celebrated celebration delight
+        delighted success successful succeed succeeded win wins won victory hope
+        hopeful hopes optimism optimistic proud pride praise praised thrilled relief
+        relieved welcome welcomed breakthrough improve improved improvement recovery
+        thrive thriving boost boosted achieve achieved achievement milestone
+        """,
+    "fear": """
+        fear fears feared afraid scared scare scary panic panicked alarm alarming
+        alarmed threat threats threaten threatened danger dangerous risk risks risky
+        crisis crises warn warns warned warning worry worried worries anxious anxiety
+        terror terrifying deadly death deaths killed victims collapse collapsed
+        emergency disaster catastrophe catastrophic outbreak uncertain uncertainty
+        """,
+    "surprise": """
+        surprise surprised surprising surprisingly unexpected unexpectedly sudden
+        suddenly shock shocked shocking stunned stunning astonishing astonished
+        unprecedented abrupt abruptly unforeseen startling remarkable bombshell
+        twist revealed reveals
+        """,
+}
+
+SENSATIONAL_TERMS = """
+    shocking bombshell explosive slams slammed blasts blasted destroys destroyed
+    devastating horrifying horrific insane unbelievable incredible outrageous
+    scandal chaos meltdown nightmare catastrophic epic jaw-dropping mind-blowing
+    must-see exposed secret secrets stunning brutal
+    """
+
+# Share of matching tokens at which a score saturates at 1.0
+EMOTION_SATURATION = 0.05
+# Below this every emotion counts as noise and the tone is Neutral
+TONE_THRESHOLD = 0.15
+# Sensationalism score at which the article is labelled Sensational
+SENSATIONAL_THRESHOLD = 0.5
+
+EMOTION_TONES = {
+    "anger": "Angry",
+    "fear": "Fearful",
+    "joy": "Hopeful",
+}
+
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z'\-]*")
+_ALL_CAPS_RE = re.compile(r"\b[A-Z]{3,}\b")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# One token -> category table, built once at import
+_LEXICON_INDEX = {
+    word: category
+    for category, words in EMOTION_LEXICON.items()
+    for word in words.split()
+}
+_LEXICON_INDEX.update({word: "sensational" for word in SENSATIONAL_TERMS.split()})
+
+
+def count_lexicon_hits(text):
+    """
+    Tokenize once and count lexicon categories in a single pass.
+    Returns (token_count, Counter of category -> hits).
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    lookup = _LEXICON_INDEX.get
+    hits = Counter(filter(None, map(lookup, tokens)))
+    return len(tokens), hits
+
+
+def sensationalism_signals(text, token_count, hits):
+    exclamations = text.count("!")
+    all_caps = len(_ALL_CAPS_RE.findall(text))
+    loaded_terms = hits.get("sensational", 0)
+
+    if not token_count:
+        score = 0.0
+    else:
+        # Weighted density of loaded language, shouting and exclamation marks
+        density = (loaded_terms * 3 + all_caps + exclamations * 2) / token_count
+        score = min(1.0, density / EMOTION_SATURATION)
+
+    return {
+        "score": round(score, 2),
+        "loaded_terms": loaded_terms,
+        "exclamations": exclamations,
+        "all_caps": all_caps,
+    }
+
+
+def quick_analyze(text):
+    """
+    Approximate tone, emotion scores and sensationalism without any network call.
+    Returns the keys of analyze_article except tone_color, plus "sensationalism",
+    "heuristic" and "source".
+    """
+    text = text or ""
+    token_count, hits = count_lexicon_hits(text)
+
+    emotion_score = {}
+    for emotion in EMOTION_LEXICON:
+        density = hits.get(emotion, 0) / token_count if token_count else 0.0
+        emotion_score[emotion] = round(min(1.0, density / EMOTION_SATURATION), 2)
+
+    dominant = max(emotion_score, key=emotion_score.get)
+    if emotion_score[dominant] < TONE_THRESHOLD:
+        tone = "Neutral"
+    else:
+        tone = EMOTION_TONES.get(dominant, "Neutral")
+
+    sensationalism = sensationalism_signals(text, token_count, hits)
+    perspective_label = "Sensational" if sensationalism["score"] >= SENSATIONAL_THRESHOLD else "Unknown"
+
+    # Lead sentences stand in for a summary
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text.strip()) if s.strip()]
+    summary = " ".join(sentences[:3]) or "Could not process article."
+
+    return {
+        "summary": summary,
+        "perspective_label": perspective_label,
+        "tone": tone,
+        "emotion_score": emotion_score,
+        "sensationalism": sensationalism,
+        "heuristic": True,
+        "source": "fallback",
+    }
+
+
+def is_low_signal(analysis):
+    """
+    True when a quick analysis shows nothing worth a full GPT analysis:
+    neutral tone, weak emotions and no sensational framing.
+    """
+    return (
+        analysis["tone"] == "Neutral"
+        and max(analysis["emotion_score"].values(), default=0.0) < TONE_THRESHOLD
+        and analysis["sensationalism"]["score"] < SENSATIONAL_THRESHOLD / 2
+    )
@@ -0,0 +1,233 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# Cleans paragraphs extracted from a page before they are sent to GPT:
+# boilerplate removal, normalization, then de-duplication within the page and across a site.
+
+# Ancestors whose paragraphs are never article body
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form", "figcaption", "figure", "noscript", "button"}
+# The article's own container: class/id hints above it are not checked
+CONTENT_TAGS = {"article", "main"}
+# class/id fragments that mark cookie banners, pitches, captions and teasers
+BOILERPLATE_HINTS = re.compile(
+    r"cookie|consent|gdpr|newsletter|subscri|signup|sign-up|promo|advert|sponsor|"
+    r"related|recommend|read-more|more-stories|share|social|caption|credit|footer|byline|comments",
+    re.I,
+)
+# CMS taxonomy classes (WordPress "tag-social-media", "category-credit") say
+# what the article is about, not what the element is
+TAXONOMY_CLASS = re.compile(r"^(tag|category)-", re.I)
+# Paragraphs that are mostly link text are navigation or teasers
+MAX_LINK_DENSITY = 0.5
+# Short paragraphs are dropped, more aggressively near the top and bottom of the page
+MIN_CHARS = 30
+MIN_CHARS_AT_EDGES = 80
+EDGE_FRACTION = 0.15
+# If cleaning keeps less than this share of the page's paragraph text, the
+# page layout wasn't understood and the uncleaned paragraphs are used instead
+MIN_KEPT_FRACTION = 0.2
+# A paragraph seen on this many other pages of the same site is boilerplate
+SITE_REPEAT_LIMIT = 2
+# Sites, and pages / paragraph hashes per site, remembered for de-duplication
+MAX_SITES = 200
+MAX_HASHES_PER_SITE = 5000
+
+_ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff\u00ad"))
+_PUNCTUATION = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2013": "-", "\u2014": "-",
+})
+_WHITESPACE = re.compile(r"\s+")
+
+# site -> {"pages": pages seen, "paragraphs": paragraph hash -> pages it was on}
+_sites = OrderedDict()
+# Pages may be cleaned from several fetch threads at once
+_sites_lock = threading.Lock()
+
+
+class Paragraph:
+    def __init__(self, text, link_chars=0, boilerplate=False):
+        self.text = text
+        self.link_chars = link_chars
+        self.boilerplate = boilerplate
+
+
+def approx_tokens(text):
+    # ~4 characters per token for English GPT tokenizers
+    return (len(text) + 3) // 4
+
+
+def normalize_text(text):
+    """
+    Unicode NFKC, plain quotes and dashes, no zero-width characters,
+    single spaces.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    text = text.translate(_ZERO_WIDTH).translate(_PUNCTUATION)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _in_boilerplate(element):
+    check_hints = True
+    for parent in element.parents:
+        if parent.name in BOILERPLATE_TAGS:
+            return True
+        if parent.name in CONTENT_TAGS:
+            check_hints = False
+        if not check_hints:
+            continue
+        attrs = getattr(parent, "attrs", None) or {}
+        classes = [c for c in attrs.get("class", []) if not TAXONOMY_CLASS.match(c)]
+        hints = " ".join(classes) + " " + (attrs.get("id") or "")
+        if BOILERPLATE_HINTS.search(hints):
+            return True
+    return False
+
+
+def extract_paragraphs(soup):
+    """
+    Collect <p> elements with the layout signals used by remove_boilerplate.
+    """
+    paragraphs = []
+    for p in soup.find_all("p"):
+        text = p.get_text()
+        link_chars = sum(len(a.get_text()) for a in p.find_all("a"))
+        paragraphs.append(Paragraph(text, link_chars, _in_boilerplate(p)))
+    return paragraphs
+
+
+def remove_boilerplate(paragraphs):
+    """
+    Drop paragraphs in boilerplate containers, link-heavy ones, and short ones
+    (stricter near the edges of the page).
+    """
+    kept = []
+    total = len(paragraphs)
+    for index, paragraph in enumerate(paragraphs):
+        length = len(paragraph.text.strip())
+        if paragraph.boilerplate or not length:
+            continue
+        if paragraph.link_chars / length > MAX_LINK_DENSITY:
+            continue
+        position = index / total
+        at_edge = position < EDGE_FRACTION or position >= 1 - EDGE_FRACTION
+        if length < (MIN_CHARS_AT_EDGES if at_edge else MIN_CHARS):
+            continue
+        kept.append(paragraph)
+    return kept
+
+
+def page_key(url):
+    """
+    Identify a page by host and path, so tracking parameters, fragments,
+    http/https, www., a trailing slash or an /amp suffix don't make it a new page.
+    """
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parsed.path.rstrip("/")
+    if path.endswith("/amp"):
+        path = path[:-4]
+    return host + path
+
+
+def _fingerprint(text):
+    return hashlib.blake2b(text.lower().encode("utf-8"), digest_size=8).digest()
+
+
+def remove_repeated(texts, site=None, page=None):
+    """
+    Drop paragraphs repeated within the page, and, when a site is given,
+    paragraphs already seen on SITE_REPEAT_LIMIT other pages of that site.
+    Re-cleaning the same page (see page_key) does not count it twice, and
+    the site check never removes every paragraph of a page.
+    """
+    with _sites_lock:
+        state = None
+        if site:
+            state = _sites.pop(site, None) or {"pages": OrderedDict(), "paragraphs": OrderedDict()}
+            # Most recently used site goes last; evict the oldest
+            _sites[site] = state
+            while len(_sites) > MAX_SITES:
+                _sites.popitem(last=False)
+
+        revisit = state is not None and page is not None and page in state["pages"]
+        seen_here = set()
+        unique = []
+        kept = []
+
+        for text in texts:
+            fingerprint = _fingerprint(text)
+            if fingerprint in seen_here:
+                continue
+            seen_here.add(fingerprint)
+            unique.append(text)
+            if state is not None:
+                elsewhere = state["paragraphs"].get(fingerprint, 0) - (1 if revisit else 0)
+                if elsewhere >= SITE_REPEAT_LIMIT:
+                    continue
+            kept.append(text)
+
+        # Everything "seen elsewhere" means the page is a copy, not boilerplate
+        if not kept:
+            kept = unique
+
+        if state is not None and not revisit:
+            paragraphs = state["paragraphs"]
+            for fingerprint in seen_here:
+                paragraphs[fingerprint] = paragraphs.pop(fingerprint, 0) + 1
+            while len(paragraphs) > MAX_HASHES_PER_SITE:
+                paragraphs.popitem(last=False)
+            if page is not None:
+                state["pages"][page] = None
+                while len(state["pages"]) > MAX_HASHES_PER_SITE:
+                    state["pages"].popitem(last=False)
+
+        return kept
+
+
+def _stage(name, texts):
+    joined = " ".join(texts)
+    return {
+        "stage": name,
+        "paragraphs": len(texts),
+        "chars": len(joined),
+        "tokens": approx_tokens(joined),
+    }
+
+
+def clean_paragraphs(paragraphs, site=None, page=None):
+    """
+    Run every cleaning stage. Returns the article text and per-stage stats
+    (paragraphs, characters and approximate tokens left after each stage).
+    """
+    stats = [_stage("extracted", [p.text for p in paragraphs])]
+
+    body = remove_boilerplate(paragraphs)
+    texts = [p.text for p in body]
+    if len(" ".join(texts)) < stats[0]["chars"] * MIN_KEPT_FRACTION:
+        print(f"⚠️ Boilerplate removal kept {len(' '.join(texts))}/{stats[0]['chars']} chars, using the page as is")
+        texts = [p.text for p in paragraphs if p.text.strip()]
+    stats.append(_stage("boilerplate", texts))
+
+    texts = [normalize_text(text) for text in texts]
+    stats.append(_stage("normalized", texts))
+
+    texts = remove_repeated(texts, site, page)
+    stats.append(_stage("deduplicated", texts))
+
+    return " ".join(texts), stats
+
+
+def format_stats(stats):
+    first = stats[0]
+    parts = [f"{first['stage']} {first['chars']} chars/~{first['tokens']} tok"]
+    for stage in stats[1:]:
+        saved = 1 - stage["chars"] / first["chars"] if first["chars"] else 0.0
+        parts.append(f"{stage['stage']} {stage['chars']}/~{stage['tokens']} (-{saved:.0%})")
+    return " → ".join(parts)
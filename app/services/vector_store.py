@@ -0,0 +1,283 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from flask import current_app
+
+from .embedding_utils import embed_texts, embedding_model
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# Corpus size from which an IVF index is worth building
+INDEX_MIN_ROWS = 100_000
+# Partitions scanned per query when the IVF index is used
+DEFAULT_NPROBE = 8
+# Rows scored per matrix product in a brute-force scan
+SCAN_CHUNK = 65_536
+# Rows sampled to train the IVF centroids
+TRAIN_SAMPLE = 50_000
+
+
+class VectorStore:
+    """
+    Append-only float32 embedding matrix on disk, keyed by article id.
+
+    vectors.f32  n x dim row-major float32, L2-normalised rows
+    ids.i64      article id of each row
+    lists.i32    IVF partition of each row, -1 before an index exists
+    centroids.f32  IVF centroids, only once build_index has run
+
+    Files are memory-mapped for search and re-mapped when another process
+    has appended to or replaced them.
+    """
+
+    def __init__(self, path, dim):
+        self.path = path
+        self.dim = dim
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._versions = None
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._centroids = None
+        self._partitions = None
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _map(self, name, dtype, count, shape=None):
+        if count == 0:
+            return np.zeros(shape or (0,), dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape or (count,))
+
+    def _version(self, name):
+        # build_index replaces files with new ones of the same size, so the
+        # inode and mtime are compared too
+        try:
+            stat = os.stat(self._file(name))
+        except FileNotFoundError:
+            return 0, None, None
+        return stat.st_size, stat.st_ino, stat.st_mtime_ns
+
+    def _refresh(self):
+        names = ("vectors.f32", "ids.i64", "lists.i32", "centroids.f32")
+        versions = tuple(self._version(n) for n in names)
+        if versions == self._versions:
+            return
+        sizes = [version[0] for version in versions]
+        # A row counts once all three files hold it (ids are written last)
+        n = min(sizes[0] // (4 * self.dim), sizes[1] // 8, sizes[2] // 4)
+        self._vectors = self._map("vectors.f32", np.float32, n, (n, self.dim))
+        self._ids = self._map("ids.i64", np.int64, n)
+        self._lists = self._map("lists.i32", np.int32, n)
+        n_centroids = sizes[3] // (4 * self.dim)
+        self._centroids = np.fromfile(self._file("centroids.f32"), dtype=np.float32).reshape(
+            n_centroids, self.dim) if n_centroids else None
+        self._partitions = None
+        self._versions = versions
+
+    def _partition_rows(self):
+        # Rows grouped by IVF partition: order[bounds[p + 1]:bounds[p + 2]] is partition p,
+        # order[:bounds[1]] the rows without one. Rebuilt whenever the files change.
+        if self._partitions is None:
+            lists = np.asarray(self._lists)
+            order = np.argsort(lists, kind="stable")
+            bounds = np.searchsorted(lists[order], np.arange(-1, len(self._centroids) + 1))
+            self._partitions = (order, bounds)
+        return self._partitions
+
+    @contextmanager
+    def _exclusive(self):
+        # Serialises writers across threads, and across processes where flock exists
+        with self._lock, open(self._file("lock"), "a") as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def __len__(self):
+        self._refresh()
+        return len(self._ids)
+
+    def known_ids(self):
+        self._refresh()
+        return set(self._ids.tolist())
+
+    def add(self, ids, vectors):
+        """
+        Append rows. New rows join their nearest IVF partition if an index exists.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+
+        with self._exclusive():
+            self._refresh()
+            before = len(self._ids)
+            if self._centroids is not None:
+                lists = np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+            else:
+                lists = np.full(len(ids), -1, dtype=np.int32)
+            # Vectors first and ids last, so readers never see a partial row.
+            # Each file is cut back to the committed rows first: a write that
+            # failed halfway would otherwise shift every later row out of line.
+            for name, data in (("vectors.f32", vectors), ("lists.i32", lists), ("ids.i64", ids)):
+                with open(self._file(name), "ab") as f:
+                    f.truncate(before * data[:1].nbytes)
+                    f.write(data.tobytes())
+
+        if self._centroids is None and before < INDEX_MIN_ROWS <= before + len(ids):
+            print(f"ℹ️ {len(self)} vectors stored, run `flask embeddings build-index` to speed up search")
+
+    def search(self, queries, k=5, exclude=None, nprobe=DEFAULT_NPROBE):
+        """
+        Top-k rows for each query row by cosine similarity.
+        `exclude` optionally gives one article id per query to leave out.
+        Returns a list of [(article_id, score), ...] per query.
+        """
+        self._refresh()
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if exclude is None:
+            exclude = [None] * len(queries)
+        # Extra candidates cover rows of the same article stored twice
+        depth = k * 2 + 1
+
+        if self._centroids is not None:
+            candidates = self._search_ivf(queries, depth, nprobe)
+        else:
+            candidates = self._search_flat(queries, depth)
+
+        results = []
+        for (rows, scores), skip in zip(candidates, exclude):
+            order = np.argsort(-scores)
+            found, seen = [], set()
+            for i in order:
+                article_id = int(self._ids[rows[i]])
+                if article_id == skip or article_id in seen:
+                    continue
+                seen.add(article_id)
+                found.append((article_id, float(scores[i])))
+                if len(found) == k:
+                    break
+            results.append(found)
+        return results
+
+    def _search_flat(self, queries, depth):
+        n = len(self._ids)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, n, SCAN_CHUNK):
+            block = np.asarray(self._vectors[start:start + SCAN_CHUNK])
+            scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(
+                np.arange(start, start + len(block)), (len(queries), len(block)))], axis=1)
+            if scores.shape[1] > depth:
+                top = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+
+        return list(zip(best_rows, best_scores))
+
+    def _search_ivf(self, queries, depth, nprobe):
+        nprobe = min(nprobe, len(self._centroids))
+        probes = np.argpartition(-(queries @ self._centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        order, bounds = self._partition_rows()
+
+        candidates = []
+        for query, probe in zip(queries, probes):
+            # Rows added before the index was built have no partition yet
+            rows = np.sort(np.concatenate(
+                [order[:bounds[1]]] + [order[bounds[p + 1]:bounds[p + 2]] for p in probe]))
+            scores = np.asarray(self._vectors[rows]) @ query
+            if len(rows) > depth:
+                top = np.argpartition(-scores, depth - 1)[:depth]
+                rows, scores = rows[top], scores[top]
+            candidates.append((rows, scores))
+        return candidates
+
+    def build_index(self, n_lists=None, iterations=10, seed=0):
+        """
+        Train IVF centroids with spherical k-means on a sample, then assign every row.
+        """
+        with self._exclusive():
+            self._refresh()
+            n = len(self._ids)
+            if not n:
+                return 0
+            n_lists = n_lists or max(1, int(np.sqrt(n)))
+            rng = np.random.default_rng(seed)
+
+            sample = np.asarray(self._vectors[np.sort(rng.choice(n, min(n, TRAIN_SAMPLE), replace=False))])
+            centroids = sample[rng.choice(len(sample), min(n_lists, len(sample)), replace=False)].copy()
+            for _ in range(iterations):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(len(centroids)):
+                    members = sample[assign == c]
+                    if len(members):
+                        mean = members.sum(axis=0)
+                        centroids[c] = mean / (np.linalg.norm(mean) or 1.0)
+
+            lists = np.empty(n, dtype=np.int32)
+            for start in range(0, n, SCAN_CHUNK):
+                block = np.asarray(self._vectors[start:start + SCAN_CHUNK])
+                lists[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+            # Drop the old maps before rewriting the files underneath them
+            self._versions = None
+            self._lists = self._centroids = self._partitions = None
+            # Replace rather than overwrite, so other processes' maps stay valid
+            for name, data in (("lists.i32", lists), ("centroids.f32", centroids.astype(np.float32))):
+                data.tofile(self._file(name + ".tmp"))
+                os.replace(self._file(name + ".tmp"), self._file(name))
+            return len(centroids)
+
+
+def get_vector_store():
+    """
+    The app's store for the active embedding model, under instance/embeddings/<model>.
+    """
+    stores = current_app.extensions.setdefault("vector_stores", {})
+    model, dim = embedding_model()
+    if model not in stores:
+        stores[model] = VectorStore(os.path.join(current_app.instance_path, "embeddings", model), dim)
+    return stores[model]
+
+
+def _article_text(article):
+    return " ".join(filter(None, [article.title, article.full_text or article.summary]))
+
+
+def index_articles(articles):
+    """
+    Embed and append saved NewsArticle rows. Returns how many were added.
+    """
+    articles = [article for article in articles if article.id]
+    if not articles:
+        return 0
+    vectors = embed_texts([_article_text(article) for article in articles])
+    get_vector_store().add([article.id for article in articles], vectors)
+    return len(articles)
+
+
+def index_and_match(article_id, text, k=5, deadline=None):
+    """
+    Find the k stored articles closest to a newly saved one, then append it.
+    Returns [(article_id, score), ...]; the article is embedded only once.
+    Takes plain values rather than the model, so it can run off the request thread.
+    """
+    store = get_vector_store()
+    vector = embed_texts([text], deadline=deadline)
+    matches = store.search(vector, k=k, exclude=[article_id])[0] if len(store) else []
+    store.add([article_id], vector)
+    return matches
@@ -0,0 +1,109 @@
+"""
+Storage size and list-query time of NewsArticle before and after compressed,
+deferred full_text, on throwaway SQLite databases.
+
+    python benchmarks/bench_article_storage.py [--rows 2000] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import db
+from app.models import NewsArticle
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class LegacyNewsArticle(db.Model):
+    # NewsArticle as it was: plain Text body, loaded with every row
+    __bind_key__ = "legacy"
+    __tablename__ = "news_article"
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(300))
+    url = db.Column(db.String(500))
+    full_text = db.Column(db.Text)
+    summary = db.Column(db.Text)
+    bias = db.Column(db.String(50))
+    tone = db.Column(db.String(50))
+    emotion_score = db.Column(db.Text)
+
+
+def fixture_paragraphs():
+    paragraphs = []
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), "rb") as f:
+                soup = BeautifulSoup(f.read(), "html.parser")
+            paragraphs.extend(p.get_text() for p in soup.select(".article-body p"))
+    return paragraphs
+
+
+def fill(model, rows, paragraphs):
+    rng = random.Random(0)
+    for i in range(rows):
+        body = rng.sample(paragraphs, len(paragraphs))
+        db.session.add(model(
+            title=f"Article {i}",
+            url=f"https://dailyledger.example/story/{i}",
+            full_text=" ".join(body),
+            summary=" ".join(body[:2]),
+            bias="Neutral",
+            tone="Neutral",
+            emotion_score='{"anger": 0.1, "joy": 0.2, "fear": 0.0, "surprise": 0.0}',
+        ))
+    db.session.commit()
+
+
+def time_list_query(model, limit, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for art in model.query.order_by(model.id.desc()).limit(limit).all():
+            art.summary[:100]
+        db.session.expunge_all()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    paths = {"before": os.path.join(tmp, "before.db"), "after": os.path.join(tmp, "after.db")}
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{paths['after']}"
+    app.config["SQLALCHEMY_BINDS"] = {"legacy": f"sqlite:///{paths['before']}"}
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        paragraphs = fixture_paragraphs()
+        models = {"before": LegacyNewsArticle, "after": NewsArticle}
+
+        for label, model in models.items():
+            fill(model, args.rows, paragraphs)
+            engine = db.engines["legacy" if label == "before" else None]
+            with engine.connect() as conn:
+                body_bytes = conn.exec_driver_sql("SELECT SUM(LENGTH(full_text)) FROM news_article").scalar()
+                conn.exec_driver_sql("VACUUM")
+            print(f"{label:>6}: full_text {body_bytes / 1024:.0f} KiB, "
+                  f"database file {os.path.getsize(paths[label]) / 1024:.0f} KiB")
+
+        for limit in (10, 500):
+            for label, model in models.items():
+                ms = time_list_query(model, limit, args.repeat)
+                print(f"{label:>6}: list query (limit {limit}) {ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
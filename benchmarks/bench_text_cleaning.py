@@ -0,0 +1,81 @@
+"""
+Compare prompt input before and after text cleaning on the fixture pages.
+
+    python benchmarks/bench_text_cleaning.py          # tokens, cleaning time, body check
+    python benchmarks/bench_text_cleaning.py --live   # also time analyze_article (needs OPENAI_API_KEY)
+"""
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.fetch_utils import MAX_ARTICLE_CHARS
+from app.services.text_utils import approx_tokens, clean_paragraphs, extract_paragraphs, format_stats, normalize_text
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SITE = "dailyledger.example"
+
+
+def raw_text(soup):
+    # What fetch_text_from_url sent before cleaning
+    return " ".join(p.get_text() for p in soup.find_all("p"))[:MAX_ARTICLE_CHARS]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="time analyze_article on raw and cleaned text")
+    args = parser.parse_args()
+
+    totals = {"raw": 0, "clean": 0, "seconds": 0.0}
+    pages = []
+
+    for name in sorted(os.listdir(FIXTURES)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES, name), "rb") as f:
+            soup = BeautifulSoup(f.read(), "html.parser")
+
+        raw = raw_text(soup)
+        start = time.perf_counter()
+        clean, stats = clean_paragraphs(extract_paragraphs(soup), site=SITE, page=name)
+        elapsed = time.perf_counter() - start
+        clean = clean[:MAX_ARTICLE_CHARS]
+
+        body = [normalize_text(p.get_text()) for p in soup.select(".article-body p")]
+        missing = [p for p in body if p not in clean]
+
+        print(f"{name}")
+        print(f"  {format_stats(stats)}")
+        print(f"  prompt tokens ~{approx_tokens(raw)} -> ~{approx_tokens(clean)}, cleaned in {elapsed * 1000:.2f} ms")
+        print(f"  article body: {len(body) - len(missing)}/{len(body)} paragraphs kept")
+        for paragraph in missing:
+            print(f"    MISSING: {paragraph[:80]}")
+
+        totals["raw"] += approx_tokens(raw)
+        totals["clean"] += approx_tokens(clean)
+        totals["seconds"] += elapsed
+        pages.append((name, raw, clean, missing))
+
+    saved = 1 - totals["clean"] / totals["raw"] if totals["raw"] else 0.0
+    print(f"\nTotal prompt tokens per GPT call ~{totals['raw']} -> ~{totals['clean']} (-{saved:.0%}), "
+          f"cleaning {totals['seconds'] * 1000:.2f} ms for {len(pages)} pages")
+
+    if args.live:
+        from app.services.ai_utils import analyze_article
+
+        for label, index in (("raw", 1), ("cleaned", 2)):
+            start = time.perf_counter()
+            for page in pages:
+                analyze_article(page[index])
+            print(f"analyze_article on {label} text: {(time.perf_counter() - start) / len(pages):.2f} s/article")
+
+    if any(page[3] for page in pages):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Run the feed poller against the fixture feeds in fixtures/feeds, served from a
+local HTTP server, on a throwaway SQLite database. No network access or API key
+is needed: GPT calls fail fast and fall back to the offline analysis.
+
+    python benchmarks/check_feed_poller.py
+"""
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ["OPENAI_BASE_URL"] = "http://127.0.0.1:9/v1"
+os.environ["EMBEDDING_BACKEND"] = "local"
+
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import db
+from app.models import FeedItem, FeedSource, NewsArticle
+from app.services import ai_utils
+from app.services.feed_utils import (
+    MAX_ITEM_ATTEMPTS, FeedEntry, fetch_feed, new_entries, parse_feed, poll_source, record_failure, reschedule
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+FEEDS = os.path.join(FIXTURES, "feeds")
+FEED_HOST = "http://dailyledger.example"
+
+failures = []
+
+
+def check(label, condition):
+    print(f"  {'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        failures.append(label)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves fixtures/ with feed links pointed at this server. Feeds get an ETag
+    and answer If-None-Match with 304; paths in `fail_once` answer 503 once.
+    """
+    base = ""
+    fail_once = set()
+    log = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path in self.fail_once:
+            self.fail_once.discard(path)
+            return self._send(503)
+        name = os.path.normpath(path.lstrip("/"))
+        file_path = os.path.join(FIXTURES, name)
+        if name.startswith("..") or not os.path.isfile(file_path):
+            return self._send(404)
+
+        with open(file_path, "rb") as f:
+            body = f.read()
+        headers = {}
+        if name.endswith(".xml"):
+            body = body.replace(FEED_HOST.encode(), self.base.encode())
+            headers["ETag"] = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get("If-None-Match") == headers["ETag"]:
+                return self._send(304)
+        self._send(200, body, headers)
+
+    def _send(self, status, body=b"", headers=None):
+        self.log.append((self.path, status))
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def check_parsing():
+    print("parse_feed")
+    expected = {
+        "dailyledger_rss.xml": [
+            ("dailyledger_council_budget.html", datetime(2025, 6, 2, 8, 0)),
+            ("dailyledger_withdrawn_story.html", datetime(2025, 6, 2, 10, 0)),
+            ("dailyledger_river_flooding.html", datetime(2025, 6, 2, 13, 30)),
+            ("dailyledger_school_lunch.html", datetime(2025, 6, 2, 15, 0)),
+            ("dailyledger_school_lunch.html", datetime(2025, 6, 2, 15, 0)),
+        ],
+        "dailyledger_atom.xml": [
+            ("dailyledger_council_budget.html", datetime(2025, 6, 2, 8, 0)),
+            ("dailyledger_river_flooding.html", datetime(2025, 6, 2, 13, 30)),
+            ("dailyledger_school_lunch.html", datetime(2025, 6, 2, 15, 0)),
+        ],
+        "dailyledger_sitemap.xml": [
+            ("dailyledger_council_budget.html", datetime(2025, 6, 2, 8, 0)),
+            ("dailyledger_river_flooding.html", datetime(2025, 6, 2, 13, 30)),
+            ("dailyledger_school_lunch.html", datetime(2025, 6, 2, 0, 0)),
+        ],
+    }
+    for name, items in expected.items():
+        with open(os.path.join(FEEDS, name), "rb") as f:
+            entries = parse_feed(f.read())
+        parsed = [(e.url.rsplit("/", 1)[-1], e.published) for e in entries]
+        check(f"{name}: links and UTC dates", parsed == items)
+        check(f"{name}: titles", all(e.title for e in entries) or name.endswith("sitemap.xml"))
+
+
+def check_polling(app, base):
+    print("poll_source")
+    executor = ThreadPoolExecutor(max_workers=2)
+
+    with app.app_context():
+        rss = FeedSource(name="RSS", url=f"{base}/feeds/dailyledger_rss.xml")
+        atom = FeedSource(name="Atom", url=f"{base}/feeds/dailyledger_atom.xml")
+        db.session.add_all([rss, atom])
+        db.session.commit()
+
+        # The withdrawn story is a 404 and the flooding story fails once with a 503
+        FixtureHandler.fail_once.add("/dailyledger_river_flooding.html")
+        stored = poll_source(rss, executor)
+        urls = {url for url, in db.session.query(NewsArticle.url)}
+        check("first RSS poll stores the two pages that loaded, once each", stored == 2 and len(urls) == 2)
+        check("error pages are not stored", not any("withdrawn" in url or "flooding" in url for url in urls))
+        check("the 404 item is given up at once", FeedItem.query.filter_by(given_up=True).count() == 1)
+        check("watermark passes the given-up item but stays below the retried one",
+              rss.watermark == datetime(2025, 6, 2, 10, 0))
+        check("validators are dropped so the failed item is retried", rss.etag is None)
+        check("poll interval halves after new items", rss.poll_interval == 450)
+
+        FixtureHandler.log.clear()
+        stored = poll_source(rss, executor)
+        check("second RSS poll picks up the item that failed with 503", stored == 1)
+        check("the 404 item is not requested again", not any("withdrawn" in path for path, _ in FixtureHandler.log))
+        check("the 404 item is still not stored", NewsArticle.query.count() == 3)
+        check("a poll with only retries doesn't speed polling up", rss.poll_interval == 675)
+        check("validators are kept once nothing is left to retry", rss.etag is not None)
+
+        FixtureHandler.log.clear()
+        stored = poll_source(rss, executor)
+        check("third RSS poll, with only the given-up item left, gets a 304",
+              stored == 0 and FixtureHandler.log == [("/feeds/dailyledger_rss.xml", 304)])
+
+        stored = poll_source(atom, executor)
+        check("Atom items already stored from RSS are skipped", stored == 0)
+        check("Atom watermark moves to the newest entry", atom.watermark == datetime(2025, 6, 2, 15, 0))
+        check("Atom poll interval grows without new items", atom.poll_interval == 1350)
+
+        FixtureHandler.log.clear()
+        check("unchanged Atom feed answers 304", fetch_feed(atom) is None
+              and ("/feeds/dailyledger_atom.xml", 304) in FixtureHandler.log)
+        check("304 poll stores nothing", poll_source(atom, executor) == 0)
+
+        sitemap_path = os.path.join(FEEDS, "dailyledger_sitemap.xml")
+        with open(sitemap_path, "rb") as f:
+            content = f.read()
+        sitemap = FeedSource(name="Sitemap", url="file://" + sitemap_path, watermark=datetime(2025, 6, 2, 9, 0))
+        entries = parse_feed(content)
+        fresh = new_entries(sitemap, entries + entries)
+        check("new_entries drops entries at or below the watermark, and repeats",
+              [e.url.rsplit("/", 1)[-1] for e in fresh] == ["dailyledger_river_flooding.html"])
+        sitemap.watermark = None
+        stored_entries = parse_feed(content.replace(FEED_HOST.encode(), base.encode()))
+        check("new_entries drops URLs already stored", new_entries(sitemap, stored_entries) == [])
+        check("file:// feed is read once, then reported unchanged",
+              fetch_feed(sitemap) is not None and fetch_feed(sitemap) is None)
+
+        entry = FeedEntry(f"{base}/empty.html")
+        retried = [record_failure(rss, FeedItem.query.filter_by(url=entry.url).first(), entry, "No article text found")
+                   for _ in range(MAX_ITEM_ATTEMPTS)]
+        db.session.flush()
+        check(f"an item failing without a 4xx is given up after {MAX_ITEM_ATTEMPTS} attempts",
+              retried == [True] * (MAX_ITEM_ATTEMPTS - 1) + [False])
+        db.session.rollback()
+
+        source = FeedSource(poll_interval=400, min_interval=300, max_interval=1000, error_count=0)
+        reschedule(source, found_new=True)
+        check("reschedule keeps the interval above min_interval", source.poll_interval == 300)
+        for _ in range(4):
+            reschedule(source, found_new=False)
+        check("reschedule keeps the interval below max_interval", source.poll_interval == 1000)
+        reschedule(source, found_new=False, failed=True)
+        check("failed polls back off without changing poll_interval",
+              source.error_count == 1 and source.poll_interval == 1000
+              and (source.next_poll_at - source.last_polled_at).total_seconds() == 1000)
+
+    executor.shutdown()
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    FixtureHandler.base = base
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Fail fast instead of retrying against the unreachable API
+    ai_utils.client = ai_utils.client.with_options(max_retries=0)
+
+    app = Flask(__name__, instance_path=tmp)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'feeds.db')}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    try:
+        check_parsing()
+        check_polling(app, base)
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{len(failures)} check(s) failed" if failures else "\nAll checks passed")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
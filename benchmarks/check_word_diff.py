@@ -0,0 +1,117 @@
+"""
+Check the incremental word diff used by the rewrite views against a whole-text
+difflib.ndiff, on rewrites of the fixture articles with sentences reordered,
+swapped or dropped, and check that chunking the rewrite doesn't change it.
+
+    python benchmarks/check_word_diff.py [--cases 300]
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+
+from bs4 import BeautifulSoup
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.ai_utils import IncrementalWordDiff, generate_diff_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+# Words marked over all cases may exceed ndiff's by this factor
+MAX_TOTAL_RATIO = 1.05
+# Share of swap/drop cases that must be within SLACK_WORDS of ndiff
+MIN_CLOSE_SHARE = 0.9
+SLACK_WORDS = 10
+
+
+def fixture_articles():
+    articles = []
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), "rb") as f:
+                soup = BeautifulSoup(f.read(), "html.parser")
+            articles.append(" ".join(p.get_text() for p in soup.select(".article-body p")))
+    # A longer article, so positions can be further apart than the diff window
+    articles.append(" ".join(articles))
+    return articles
+
+
+def rewrite(original, kind, rng):
+    sentences = original.split(". ")
+    if kind == "shuffle":
+        rng.shuffle(sentences)
+    elif kind == "swap":
+        for _ in range(rng.randint(1, 3)):
+            i, j = rng.randrange(len(sentences)), rng.randrange(len(sentences))
+            sentences[i], sentences[j] = sentences[j], sentences[i]
+    elif kind == "drop":
+        i = rng.randrange(len(sentences))
+        del sentences[i:i + rng.randint(1, 3)]
+    return " ".join(". ".join(sentences).split())
+
+
+def ndiff_marked(original, rewritten):
+    return sum(1 for line in difflib.ndiff(original.split(), rewritten.split()) if line[:2] in ("- ", "+ "))
+
+
+def marked(html):
+    return html.count("title='Removed'") + html.count("title='Added'")
+
+
+def chunked_html(original, rewritten, rng):
+    differ = IncrementalWordDiff(original)
+    i = 0
+    while i < len(rewritten):
+        size = rng.randint(1, 15)
+        differ.feed(rewritten[i:i + size])
+        i += size
+    differ.finish()
+    return str(differ.html())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=300)
+    args = parser.parse_args()
+
+    articles = fixture_articles()
+    failed = False
+
+    for kind in ("shuffle", "swap", "drop"):
+        rng = random.Random(0)
+        ours = theirs = close = 0
+        worst = 0
+        chunking_differs = 0
+
+        for _ in range(args.cases):
+            original = rng.choice(articles)
+            rewritten = rewrite(original, kind, rng)
+            html = str(generate_diff_html(original, rewritten))
+            a, b = marked(html), ndiff_marked(original, rewritten)
+            ours += a
+            theirs += b
+            close += a <= b + SLACK_WORDS
+            worst = max(worst, a - b)
+            chunking_differs += chunked_html(original, rewritten, rng) != html
+
+        ratio = ours / theirs if theirs else 1.0
+        share = close / args.cases
+        ok = ratio <= MAX_TOTAL_RATIO and not chunking_differs
+        if kind != "shuffle":
+            # A full shuffle has no single best diff, so only the total is held to ndiff
+            ok = ok and share >= MIN_CLOSE_SHARE
+        failed = failed or not ok
+
+        print(f"{'ok  ' if ok else 'FAIL'} {kind:>7}: {ours} words marked vs {theirs} with ndiff ({ratio:.2f}x), "
+              f"{share:.0%} within {SLACK_WORDS} words, worst +{worst}, "
+              f"{chunking_differs} case(s) changed by chunking")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
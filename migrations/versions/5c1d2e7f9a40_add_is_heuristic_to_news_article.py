@@ -0,0 +1,26 @@
+"""Add is_heuristic flag to news_article
+
+Revision ID: 5c1d2e7f9a40
+Revises: a3b6ace1852a
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1d2e7f9a40'
+down_revision = 'a3b6ace1852a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_heuristic', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.drop_column('is_heuristic')
@@ -0,0 +1,45 @@
+"""Add feed_sources table
+
+Revision ID: 8e2f4b6a1c93
+Revises: 5c1d2e7f9a40
+Create Date: 2026-10-19 14:03:27.904115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2f4b6a1c93'
+down_revision = '5c1d2e7f9a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('feed_sources',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('poll_interval', sa.Integer(), nullable=False),
+    sa.Column('min_interval', sa.Integer(), nullable=False),
+    sa.Column('max_interval', sa.Integer(), nullable=False),
+    sa.Column('next_poll_at', sa.DateTime(), nullable=True),
+    sa.Column('last_polled_at', sa.DateTime(), nullable=True),
+    sa.Column('etag', sa.String(length=255), nullable=True),
+    sa.Column('last_modified', sa.String(length=100), nullable=True),
+    sa.Column('watermark', sa.DateTime(), nullable=True),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('url')
+    )
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.create_index('ix_news_article_url', ['url'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.drop_index('ix_news_article_url')
+    op.drop_table('feed_sources')
@@ -0,0 +1,37 @@
+"""Replace is_heuristic with analysis_source on news_article
+
+Revision ID: b6d4e1a9c358
+Revises: f3a8c2d91b57
+Create Date: 2026-10-19 16:47:05.912386
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d4e1a9c358'
+down_revision = 'f3a8c2d91b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('analysis_source', sa.String(length=20), server_default='gpt', nullable=False))
+
+    # Existing offline rows can't be told apart, so they count as fallbacks
+    op.execute("UPDATE news_article SET analysis_source = 'fallback' WHERE is_heuristic")
+
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.drop_column('is_heuristic')
+
+
+def downgrade():
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_heuristic', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    op.execute("UPDATE news_article SET is_heuristic = (analysis_source != 'gpt')")
+
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.drop_column('analysis_source')
@@ -0,0 +1,77 @@
+"""Compress news_article.full_text
+
+Revision ID: c47a9d3e5b12
+Revises: 8e2f4b6a1c93
+Create Date: 2026-10-19 16:41:09.552873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import zlib
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a9d3e5b12'
+down_revision = '8e2f4b6a1c93'
+branch_labels = None
+depends_on = None
+
+# Rows rewritten per round trip, keeps locks and memory bounded on big tables
+BATCH_SIZE = 500
+COMPRESSION_LEVEL = 6
+
+
+def _copy_in_batches(source, target, convert):
+    bind = op.get_bind()
+    article = sa.table('news_article',
+        sa.column('id', sa.Integer),
+        sa.column(source),
+        sa.column(target),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(article.c.id, article.c[source])
+            .where(article.c.id > last_id)
+            .order_by(article.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            article.update().where(article.c.id == sa.bindparam('row_id')).values({target: sa.bindparam('value')}),
+            [{'row_id': row[0], 'value': convert(row[1])} for row in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def _compress(value):
+    return zlib.compress(value.encode('utf-8'), COMPRESSION_LEVEL) if value is not None else None
+
+
+def _decompress(value):
+    return zlib.decompress(value).decode('utf-8') if value is not None else None
+
+
+def upgrade():
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('full_text_z', sa.LargeBinary(), nullable=True))
+
+    _copy_in_batches('full_text', 'full_text_z', _compress)
+
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.drop_column('full_text')
+        batch_op.alter_column('full_text_z', new_column_name='full_text',
+                              existing_type=sa.LargeBinary(), existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('full_text_plain', sa.Text(), nullable=True))
+
+    _copy_in_batches('full_text', 'full_text_plain', _decompress)
+
+    with op.batch_alter_table('news_article', schema=None) as batch_op:
+        batch_op.drop_column('full_text')
+        batch_op.alter_column('full_text_plain', new_column_name='full_text',
+                              existing_type=sa.Text(), existing_nullable=True)
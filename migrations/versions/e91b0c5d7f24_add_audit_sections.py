@@ -0,0 +1,34 @@
+"""Add audit_sections table
+
+Revision ID: e91b0c5d7f24
+Revises: c47a9d3e5b12
+Create Date: 2026-10-19 18:27:53.116402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91b0c5d7f24'
+down_revision = 'c47a9d3e5b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audit_sections',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.Enum('done', 'pending', 'timed_out'), nullable=False),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['article_id'], ['news_article.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('article_id', 'name')
+    )
+
+
+def downgrade():
+    op.drop_table('audit_sections')
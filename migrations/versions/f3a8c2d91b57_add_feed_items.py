@@ -0,0 +1,35 @@
+"""Add feed_items table
+
+Revision ID: f3a8c2d91b57
+Revises: e91b0c5d7f24
+Create Date: 2026-10-19 21:42:09.561377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c2d91b57'
+down_revision = 'e91b0c5d7f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('feed_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source_id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('given_up', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['source_id'], ['feed_sources.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source_id', 'url')
+    )
+
+
+def downgrade():
+    op.drop_table('feed_items')